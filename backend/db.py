@@ -1,3 +1,7 @@
 from .orm import Prisma
 
+# Connections opened up front in the app lifespan; keep this at or below
+# the `connection_limit` set on the datasource URL in schema.prisma.
+POOL_WARM_CONNECTIONS = 8
+
 db = Prisma()
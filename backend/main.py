@@ -1,19 +1,26 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
-from .db import db
+from .db import POOL_WARM_CONNECTIONS, db
+from .responses import ORJSONResponse
 from .routers.sessions import router as sessions_router
 
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
     await db.connect()
+    # Run concurrent no-op queries so the pool opens its connections now
+    # rather than on the first requests.
+    await asyncio.gather(
+        *(db.query_raw("SELECT 1") for _ in range(POOL_WARM_CONNECTIONS))
+    )
     yield
     await db.disconnect()
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 
 app.include_router(sessions_router)
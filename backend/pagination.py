@@ -0,0 +1,27 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import Any
+
+import orjson
+from fastapi import HTTPException
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    raw = orjson.dumps([created_at.isoformat(), id])
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[int, int]:
+    try:
+        created_at, id = orjson.loads(base64.urlsafe_b64decode(cursor))
+        created_at = datetime.fromisoformat(created_at)
+        # Prisma stores SQLite DateTime columns as epoch milliseconds.
+        return int(created_at.timestamp() * 1000), int(id)
+    except (binascii.Error, orjson.JSONDecodeError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def next_cursor(rows: list[dict[str, Any]]) -> str:
+    last = rows[-1]
+    return encode_cursor(datetime.fromisoformat(last["created_at"]), last["id"])
@@ -0,0 +1,62 @@
+import asyncio
+import hashlib
+from typing import Any, Optional
+
+import orjson
+from fastapi import Request
+from fastapi.responses import ORJSONResponse as _ORJSONResponse, Response
+from pydantic import BaseModel
+
+# Payloads estimated above this many bytes are serialized in a worker
+# thread, so a page of large Lighthouse reports doesn't stall the event loop.
+THREADED_RENDER_THRESHOLD = 1024 * 1024
+
+# Polled GETs may be reused briefly by the browser and revalidated by ETag.
+CACHE_CONTROL = "private, max-age=5"
+
+
+def dumps(content: Any) -> bytes:
+    # Prisma hands back timezone-aware UTC datetimes; naive ones are
+    # assumed UTC so both serialize as `...Z` without a pre-pass.
+    return orjson.dumps(
+        content,
+        default=str,
+        option=orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z,
+    )
+
+
+class ORJSONResponse(_ORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+async def orjson_response(
+    content: Any,
+    size_hint: int = 0,
+    headers: Optional[dict[str, str]] = None,
+) -> Response:
+    if size_hint < THREADED_RENDER_THRESHOLD:
+        return ORJSONResponse(content=content, headers=headers)
+    body = await asyncio.to_thread(dumps, content)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def model_response(model: BaseModel) -> Response:
+    # Returning a Response bypasses FastAPI's response_model re-validation;
+    # pydantic-core writes the JSON directly.
+    return Response(content=model.model_dump_json(), media_type="application/json")
+
+
+def weak_etag(*parts: object) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def cache_headers(etag: str) -> dict[str, str]:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    if request.headers.get("if-none-match") != etag:
+        return None
+    return Response(status_code=304, headers=cache_headers(etag))
@@ -1,12 +1,27 @@
 from datetime import datetime
-import json
-from typing import Literal, Optional, cast
+from itertools import groupby
+from operator import itemgetter
+import time
+from typing import Annotated, Any, Literal, Optional, get_args
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+import orjson
+from async_lru import alru_cache
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response
+from pydantic import BaseModel, Field, field_validator
 
 from ..db import db
-from ..orm.types import SessionResultUpdateInput
+from ..orm.errors import RecordNotFoundError
+from ..pagination import decode_cursor, next_cursor
+from ..responses import (
+    ORJSONResponse,
+    cache_headers,
+    dumps,
+    model_response,
+    not_modified,
+    orjson_response,
+    weak_etag,
+)
 
 
 IssueType = Literal[
@@ -17,9 +32,18 @@ IssueType = Literal[
     "slow-performance",
 ]
 
+ALLOWED_ISSUES: frozenset[str] = frozenset(get_args(IssueType))
+
 ResultStatus = Literal["pending", "completed", "error"]
 Tier = float
 
+# `issuesDetected` is stored as a JSON array string; it is embedded into the
+# response as-is instead of being parsed and re-serialized per row.
+_NO_ISSUES = orjson.Fragment(b"[]")
+
+# Body of an empty listing page, which fresh sessions hit constantly.
+_EMPTY_PAGE = orjson.dumps({"items": [], "next_cursor": None, "has_more": False})
+
 
 class SessionCreate(BaseModel):
     pass
@@ -35,9 +59,23 @@ class SessionRead(BaseModel):
 
 class SessionSearchCreate(BaseModel):
     query: str
-    issues: list[IssueType]
+    # Checked with one set difference instead of a Literal match per item;
+    # the enum is kept in the OpenAPI schema by hand.
+    issues: list[str] = Field(
+        json_schema_extra={
+            "items": {"type": "string", "enum": list(get_args(IssueType))}
+        }
+    )
     max_results: int
 
+    @field_validator("issues")
+    @classmethod
+    def _check_issues(cls, issues: list[str]) -> list[str]:
+        unknown = set(issues) - ALLOWED_ISSUES
+        if unknown:
+            raise ValueError(f"Unknown issue types: {', '.join(sorted(unknown))}")
+        return issues
+
 
 class SessionSearchRead(BaseModel):
     session_id: int
@@ -68,203 +106,408 @@ class SessionResultUpdate(BaseModel):
     status: Optional[ResultStatus] = None
 
 
+class SessionResultBatchQuery(BaseModel):
+    session_ids: list[int] = Field(max_length=100)
+    limit: int = Field(default=50, ge=1, le=200)
+
+
+class SessionResultGroup(BaseModel):
+    session_id: int
+    items: list[SessionResultRead]
+
+
+class SessionPage(BaseModel):
+    items: list[SessionRead]
+    next_cursor: Optional[str]
+    has_more: bool
+
+
+class SessionResultPage(BaseModel):
+    items: list[SessionResultRead]
+    next_cursor: Optional[str]
+    has_more: bool
+
+
+_SESSIONS_SELECT_SQL = """
+SELECT
+    s.id,
+    s."createdAt" AS created_at,
+    COALESCE(s.name, 'Untitled session') AS name,
+    (ss.id IS NOT NULL) AS is_configured,
+    (ss."completedAt" IS NOT NULL) AS is_completed
+FROM "Session" s
+LEFT JOIN "SessionSearch" ss ON ss."sessionId" = s.id
+"""
+
+_LIST_SESSIONS_SQL = _SESSIONS_SELECT_SQL + """
+ORDER BY s."createdAt" DESC, s.id DESC
+LIMIT ?
+"""
+
+_LIST_SESSIONS_AFTER_SQL = _SESSIONS_SELECT_SQL + """
+WHERE (s."createdAt", s.id) < (?, ?)
+ORDER BY s."createdAt" DESC, s.id DESC
+LIMIT ?
+"""
+
+# Rows that predate the `updatedAt` column were filled by `db push` with
+# CURRENT_TIMESTAMP text, while Prisma writes epoch milliseconds. SQLite sorts
+# TEXT above INTEGER, so both are normalized before taking the MAX.
+_SESSION_RESULTS_VERSION_SQL = """
+SELECT
+    MAX(
+        CASE typeof("updatedAt")
+            WHEN 'text' THEN CAST(strftime('%s', "updatedAt") AS INTEGER) * 1000
+            ELSE "updatedAt"
+        END
+    ) AS updated_at,
+    COUNT(*) AS total
+FROM "SessionResult"
+WHERE "sessionId" = ?
+"""
+
+_GET_SESSION_SEARCH_SQL = """
+SELECT
+    id,
+    "updatedAt" AS updated_at,
+    "sessionId" AS session_id,
+    query,
+    "issuesFilter" AS issues,
+    "maxResultsRequested" AS max_results_requested,
+    "checkedWebsitesCount" AS checked_websites_count,
+    "lastSearchCursor" AS last_search_cursor,
+    ("completedAt" IS NOT NULL) AS is_completed
+FROM "SessionSearch"
+WHERE "sessionId" = ?
+"""
+
+# `createdAt` is formatted in SQL, the same way the PATCH RETURNING clause
+# does it, so every results endpoint emits one timestamp format.
+_RESULT_COLUMNS_SQL = """
+    r.id,
+    strftime('%Y-%m-%dT%H:%M:%fZ', r."createdAt" / 1000.0, 'unixepoch') AS created_at,
+    r."sessionId" AS session_id,
+    r.url,
+    r.domain,
+    r."pageCount" AS page_count,
+    r.tier,
+    r."issuesDetected" AS issues_detected,
+    r."lighthouseJson" AS lighthouse_json,
+    r."contactEmail" AS contact_email,
+    r.status
+"""
+
+_LIST_SESSION_RESULTS_SQL = "SELECT" + _RESULT_COLUMNS_SQL + """
+FROM "SessionResult" r
+WHERE r."sessionId" = ?
+ORDER BY r."createdAt" DESC, r.id DESC
+LIMIT ?
+"""
+
+_LIST_SESSION_RESULTS_AFTER_SQL = "SELECT" + _RESULT_COLUMNS_SQL + """
+FROM "SessionResult" r
+WHERE r."sessionId" = ? AND (r."createdAt", r.id) < (?, ?)
+ORDER BY r."createdAt" DESC, r.id DESC
+LIMIT ?
+"""
+
+# Ownership check, update and read-back in one round-trip. SQLite may not
+# report column types for RETURNING, so `createdAt` (epoch milliseconds in
+# Prisma's SQLite storage) and `tier` are converted explicitly.
+_UPDATE_SESSION_RESULT_SQL = """
+UPDATE "SessionResult"
+SET
+    tier = COALESCE(?, tier),
+    status = COALESCE(?, status),
+    "updatedAt" = ?
+WHERE id = ? AND "sessionId" = ?
+RETURNING
+    id,
+    strftime('%Y-%m-%dT%H:%M:%fZ', "createdAt" / 1000.0, 'unixepoch') AS created_at,
+    "sessionId" AS session_id,
+    url,
+    domain,
+    "pageCount" AS page_count,
+    CAST(tier AS REAL) AS tier,
+    "issuesDetected" AS issues_detected,
+    "lighthouseJson" AS lighthouse_json,
+    "contactEmail" AS contact_email,
+    status
+"""
+
+# Latest `limit` results for each of a JSON array of session ids, in one
+# statement; rows come back grouped by session.
+_BATCH_SESSION_RESULTS_SQL = (
+    """
+SELECT
+    id,
+    created_at,
+    session_id,
+    url,
+    domain,
+    page_count,
+    tier,
+    issues_detected,
+    lighthouse_json,
+    contact_email,
+    status
+FROM (
+    SELECT
+        ROW_NUMBER() OVER (
+            PARTITION BY r."sessionId"
+            ORDER BY r."createdAt" DESC, r.id DESC
+        ) AS position,"""
+    + _RESULT_COLUMNS_SQL
+    + """
+    FROM "SessionResult" r
+    WHERE r."sessionId" IN (SELECT value FROM json_each(?))
+)
+WHERE position <= ?
+ORDER BY session_id, position
+"""
+)
+
+
+def _embed_result_rows(
+    rows: list[dict[str, Any]],
+    _fragment: type[orjson.Fragment] = orjson.Fragment,
+    _no_issues: orjson.Fragment = _NO_ISSUES,
+) -> int:
+    # Prepares raw `_RESULT_COLUMNS_SQL` rows for orjson in place and returns
+    # the Lighthouse payload size, which dominates the page when present.
+    size_hint = 0
+    for row in rows:
+        issues = row["issues_detected"]
+        row["issues_detected"] = _fragment(issues) if issues else _no_issues
+        if row["lighthouse_json"]:
+            size_hint += len(row["lighthouse_json"])
+    return size_hint
+
+
+# Search configs are polled far more often than they change. Entries hold the
+# rendered body and are dropped on upsert; the TTL bounds staleness from
+# writers outside this process. A 404 raises, so misses are not cached.
+@alru_cache(maxsize=1024, ttl=30)
+async def _cached_session_search(session_id: int) -> tuple[str, bytes]:
+    rows = await db.query_raw(_GET_SESSION_SEARCH_SQL, session_id)
+    if not rows:
+        raise HTTPException(status_code=404, detail="Search not configured for session")
+    search = rows[0]
+
+    etag = weak_etag(search.pop("id"), search.pop("updated_at"))
+    search["issues"] = orjson.Fragment(search["issues"])
+    search["is_completed"] = bool(search["is_completed"])
+    return etag, dumps(search)
+
+
 router = APIRouter(prefix="/sessions", tags=["sessions"])
 
 
-@router.post("", response_model=SessionRead)
-async def create_session(body: SessionCreate | None = None) -> SessionRead:
+@router.post("", responses={200: {"model": SessionRead}})
+async def create_session(body: SessionCreate | None = None) -> Response:
     session = await db.session.create(
         data={},
     )
     name = getattr(session, "name", "Untitled session")
-    return SessionRead(
-        id=session.id,
-        created_at=session.createdAt,
-        name=name,
-        is_configured=False,
-        is_completed=False,
+    return model_response(
+        SessionRead.model_construct(
+            id=session.id,
+            created_at=session.createdAt,
+            name=name,
+            is_configured=False,
+            is_completed=False,
+        )
     )
 
 
-@router.get("", response_model=list[SessionRead])
-async def list_sessions(offset: int = 0, limit: int = 50) -> list[SessionRead]:
-    sessions = await db.session.find_many(
-        skip=offset,
-        take=limit,
-        order={"createdAt": "desc"},
-        include={"search": True},
-    )
-    results: list[SessionRead] = []
-    for session in sessions:
-        search = session.search
-        is_configured = search is not None
-        is_completed = bool(search and search.completedAt is not None)
-        name = getattr(session, "name", "Untitled session")
-        results.append(
-            SessionRead(
-                id=session.id,
-                created_at=session.createdAt,
-                name=name,
-                is_configured=is_configured,
-                is_completed=is_completed,
-            )
+@router.get("", responses={200: {"model": SessionPage}})
+async def list_sessions(
+    cursor: Optional[str] = None,
+    limit: Annotated[int, Query(ge=1)] = 50,
+) -> Response:
+    if cursor is None:
+        sessions = await db.query_raw(_LIST_SESSIONS_SQL, limit + 1)
+    else:
+        created_at_ms, last_id = decode_cursor(cursor)
+        sessions = await db.query_raw(
+            _LIST_SESSIONS_AFTER_SQL, created_at_ms, last_id, limit + 1
         )
-    return results
+    if not sessions:
+        return Response(content=_EMPTY_PAGE, media_type="application/json")
+    # One extra row is fetched to tell whether another page exists.
+    has_more = len(sessions) > limit
+    sessions = sessions[:limit]
+    for session in sessions:
+        # SQLite has no boolean type; the flags come back as 0/1.
+        session["is_configured"] = bool(session["is_configured"])
+        session["is_completed"] = bool(session["is_completed"])
+    return ORJSONResponse(
+        content={
+            "items": sessions,
+            "next_cursor": next_cursor(sessions) if has_more else None,
+            "has_more": has_more,
+        }
+    )
 
 
 @router.put(
     "/{session_id}/search",
-    response_model=SessionSearchRead,
+    responses={200: {"model": SessionSearchRead}},
 )
 async def upsert_session_search(
     session_id: int,
     body: SessionSearchCreate,
-) -> SessionSearchRead:
-    session = await db.session.find_unique(
-        where={"id": session_id},
-        include={"search": True},
-    )
-    if session is None:
-        raise HTTPException(status_code=404, detail="Session not found")
-
-    issues_filter = json.dumps(body.issues)
-
-    if session.search is None:
-        search = await db.sessionsearch.create(
+) -> Response:
+    issues_filter = orjson.dumps(body.issues).decode()
+
+    # A missing session makes the nested connect fail, so the existence
+    # check rides along with the single upsert round-trip.
+    try:
+        search = await db.sessionsearch.upsert(
+            where={"sessionId": session_id},
             data={
-                "session": {"connect": {"id": session_id}},
-                "query": body.query,
-                "issuesFilter": issues_filter,
-                "maxResultsRequested": body.max_results,
-                "status": "pending",
-            }
-        )
-    else:
-        search = await db.sessionsearch.update(
-            where={"id": session.search.id},
-            data={
-                "query": body.query,
-                "issuesFilter": issues_filter,
-                "maxResultsRequested": body.max_results,
+                "create": {
+                    "session": {"connect": {"id": session_id}},
+                    "query": body.query,
+                    "issuesFilter": issues_filter,
+                    "maxResultsRequested": body.max_results,
+                    "status": "pending",
+                },
+                "update": {
+                    "query": body.query,
+                    "issuesFilter": issues_filter,
+                    "maxResultsRequested": body.max_results,
+                },
             },
         )
-
-    issues: list[IssueType] = json.loads(search.issuesFilter)
-    return SessionSearchRead(
-        session_id=search.sessionId,
-        query=search.query,
-        issues=issues,
-        max_results_requested=search.maxResultsRequested,
-        checked_websites_count=search.checkedWebsitesCount,
-        last_search_cursor=search.lastSearchCursor,
-        is_completed=search.completedAt is not None,
+    except RecordNotFoundError:
+        raise HTTPException(status_code=404, detail="Session not found")
+    _cached_session_search.cache_invalidate(session_id)
+
+    issues: list[IssueType] = orjson.loads(search.issuesFilter)
+    return model_response(
+        SessionSearchRead.model_construct(
+            session_id=search.sessionId,
+            query=search.query,
+            issues=issues,
+            max_results_requested=search.maxResultsRequested,
+            checked_websites_count=search.checkedWebsitesCount,
+            last_search_cursor=search.lastSearchCursor,
+            is_completed=search.completedAt is not None,
+        )
     )
 
 
 @router.get(
     "/{session_id}/search",
-    response_model=SessionSearchRead,
+    responses={200: {"model": SessionSearchRead}},
 )
-async def get_session_search(session_id: int) -> SessionSearchRead:
-    search = await db.sessionsearch.find_unique(
-        where={"sessionId": session_id},
-    )
-    if search is None:
-        raise HTTPException(status_code=404, detail="Search not configured for session")
-
-    issues: list[IssueType] = json.loads(search.issuesFilter)
-    return SessionSearchRead(
-        session_id=search.sessionId,
-        query=search.query,
-        issues=issues,
-        max_results_requested=search.maxResultsRequested,
-        checked_websites_count=search.checkedWebsitesCount,
-        last_search_cursor=search.lastSearchCursor,
-        is_completed=search.completedAt is not None,
+async def get_session_search(session_id: int, request: Request) -> Response:
+    etag, body = await _cached_session_search(session_id)
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers=cache_headers(etag),
     )
 
 
 @router.get(
     "/{session_id}/results",
-    response_model=list[SessionResultRead],
+    responses={200: {"model": SessionResultPage}},
 )
 async def list_session_results(
     session_id: int,
-    offset: int = 0,
-    limit: int = 50,
-) -> list[SessionResultRead]:
-    results = await db.sessionresult.find_many(
-        where={"sessionId": session_id},
-        skip=offset,
-        take=limit,
-        order={"createdAt": "desc"},
-    )
-    output: list[SessionResultRead] = []
-    for result in results:
-        issues: list[IssueType] = (
-            json.loads(result.issuesDetected) if result.issuesDetected else []
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: Annotated[int, Query(ge=1)] = 50,
+) -> Response:
+    # Results only change on write, so a repeated poll can be answered from
+    # this aggregate without reading or serializing the page.
+    (version,) = await db.query_raw(_SESSION_RESULTS_VERSION_SQL, session_id)
+    etag = weak_etag(version["updated_at"], version["total"], cursor, limit)
+    if (cached := not_modified(request, etag)) is not None:
+        return cached
+
+    if cursor is None:
+        results = await db.query_raw(_LIST_SESSION_RESULTS_SQL, session_id, limit + 1)
+    else:
+        created_at_ms, last_id = decode_cursor(cursor)
+        results = await db.query_raw(
+            _LIST_SESSION_RESULTS_AFTER_SQL,
+            session_id,
+            created_at_ms,
+            last_id,
+            limit + 1,
         )
-        output.append(
-            SessionResultRead(
-                id=result.id,
-                created_at=result.createdAt,
-                session_id=result.sessionId,
-                url=result.url,
-                domain=result.domain,
-                page_count=result.pageCount,
-                tier=result.tier,
-                issues_detected=issues,
-                lighthouse_json=result.lighthouseJson,
-                contact_email=result.contactEmail,
-                status=cast(ResultStatus, result.status),
-            )
+    if not results:
+        return Response(
+            content=_EMPTY_PAGE,
+            media_type="application/json",
+            headers=cache_headers(etag),
         )
-    return output
+    has_more = len(results) > limit
+    results = results[:limit]
+    size_hint = _embed_result_rows(results)
+    return await orjson_response(
+        {
+            "items": results,
+            "next_cursor": next_cursor(results) if has_more else None,
+            "has_more": has_more,
+        },
+        size_hint,
+        headers=cache_headers(etag),
+    )
+
+
+@router.post(
+    "/results:batch",
+    responses={200: {"model": list[SessionResultGroup]}},
+)
+async def batch_session_results(body: SessionResultBatchQuery) -> Response:
+    rows = await db.query_raw(
+        _BATCH_SESSION_RESULTS_SQL,
+        orjson.dumps(body.session_ids).decode(),
+        body.limit,
+    )
+    size_hint = _embed_result_rows(rows)
+    grouped = {
+        session_id: list(items)
+        for session_id, items in groupby(rows, key=itemgetter("session_id"))
+    }
+    return await orjson_response(
+        [
+            {"session_id": session_id, "items": grouped.get(session_id, [])}
+            for session_id in dict.fromkeys(body.session_ids)
+        ],
+        size_hint,
+    )
 
 
 @router.patch(
     "/{session_id}/results/{result_id}",
-    response_model=SessionResultRead,
+    responses={200: {"model": SessionResultRead}},
 )
 async def update_session_result(
     session_id: int,
     result_id: int,
     body: SessionResultUpdate,
-) -> SessionResultRead:
-    result = await db.sessionresult.find_unique(
-        where={"id": result_id},
+) -> Response:
+    if body.tier is None and body.status is None:
+        raise HTTPException(status_code=400, detail="No fields to update")
+
+    # `@updatedAt` is maintained by Prisma's client, not the database.
+    rows = await db.query_raw(
+        _UPDATE_SESSION_RESULT_SQL,
+        body.tier,
+        body.status,
+        int(time.time() * 1000),
+        result_id,
+        session_id,
     )
-    if result is None or result.sessionId != session_id:
+    if not rows:
         raise HTTPException(status_code=404, detail="Result not found for session")
 
-    update_data: SessionResultUpdateInput = {}
-    if body.tier is not None:
-        update_data["tier"] = body.tier
-    if body.status is not None:
-        update_data["status"] = body.status
-
-    if update_data:
-        result = await db.sessionresult.update(
-            where={"id": result_id},
-            data=update_data,
-        )
-
-    if result is None:
-        raise HTTPException(status_code=404, detail="Result not found for session")
-
-    issues: list[IssueType] = (
-        json.loads(result.issuesDetected) if result.issuesDetected else []
-    )
-    return SessionResultRead(
-        id=result.id,
-        created_at=result.createdAt,
-        session_id=result.sessionId,
-        url=result.url,
-        domain=result.domain,
-        page_count=result.pageCount,
-        tier=result.tier,
-        issues_detected=issues,
-        lighthouse_json=result.lighthouseJson,
-        contact_email=result.contactEmail,
-        status=cast(ResultStatus, result.status),
-    )
+    _embed_result_rows(rows)
+    return ORJSONResponse(content=rows[0])
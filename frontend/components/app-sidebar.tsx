@@ -21,6 +21,12 @@ type Session = {
   is_completed: boolean;
 };
 
+type SessionPage = {
+  items: Session[];
+  next_cursor: string | null;
+  has_more: boolean;
+};
+
 const BACKEND_URL = import.meta.env.VITE_BACKEND_URL ?? "/api";
 
 async function fetchSessions(): Promise<Session[]> {
@@ -28,7 +34,8 @@ async function fetchSessions(): Promise<Session[]> {
   if (!response.ok) {
     throw new Error("Failed to load sessions");
   }
-  return response.json();
+  const page: SessionPage = await response.json();
+  return page.items;
 }
 
 async function createSession(): Promise<Session> {
@@ -67,6 +67,12 @@ type SessionResult = {
   status: string;
 };
 
+type SessionResultPage = {
+  items: SessionResult[];
+  next_cursor: string | null;
+  has_more: boolean;
+};
+
 const BACKEND_URL = import.meta.env.VITE_BACKEND_URL ?? "/api";
 
 const ALL_ISSUES: { value: IssueType; label: string }[] = [
@@ -101,8 +107,8 @@ export default function Page() {
       if (!response.ok) {
         throw new Error("Failed to load results");
       }
-      const data = (await response.json()) as SessionResult[];
-      setResults(data);
+      const page: SessionResultPage = await response.json();
+      setResults(page.items);
     } catch (err) {
       console.error(err);
       setResultsError("Could not load results");